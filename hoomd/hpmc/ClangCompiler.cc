@@ -14,6 +14,7 @@
 #include <clang/Lex/HeaderSearch.h>
 #include <clang/Lex/PreprocessorOptions.h>
 #include <clang/Tooling/Tooling.h>
+#include <llvm/ADT/Triple.h>
 #include <llvm/IR/LLVMContext.h>
 #include <llvm/IR/Module.h>
 #include <llvm/InitializePasses.h>
@@ -26,14 +27,39 @@
 #pragma GCC diagnostic pop
 
 #include <iostream>
+#include <mutex>
 #include <sstream>
 
 std::shared_ptr<ClangCompiler> ClangCompiler::m_clang_compiler = nullptr;
 
+namespace
+    {
+/** Get the clang argument that selects the host CPU as the code generation target
+
+    x86 selects the CPU with -march, while other targets (e.g. PowerPC and AArch64) use -mcpu.
+    "native" lets the clang driver enable the features the host actually reports, which may be
+    fewer than the CPU model implies (e.g. in a virtual machine that hides AVX-512).
+ */
+std::string getHostCPUArgument()
+    {
+    llvm::Triple triple(llvm::sys::getProcessTriple());
+    if (triple.getArch() == llvm::Triple::x86 || triple.getArch() == llvm::Triple::x86_64)
+        return "-march=native";
+
+    return "-mcpu=native";
+    }
+    } // end anonymous namespace
+
 /** Returns a shared pointer to the clang compiler singleton instance
+
+    Code may be compiled from multiple threads, so the one time initialization is protected by a
+    mutex.
  */
 std::shared_ptr<ClangCompiler> ClangCompiler::getClangCompiler()
     {
+    static std::mutex clang_compiler_mutex;
+    std::lock_guard<std::mutex> lock(clang_compiler_mutex);
+
     if (!m_clang_compiler)
         {
         m_clang_compiler = std::shared_ptr<ClangCompiler>(new ClangCompiler());
@@ -92,6 +118,13 @@ std::unique_ptr<llvm::Module> ClangCompiler::compileCode(const std::string& code
     clang_args.push_back("-D");
     clang_args.push_back("HOOMD_LLVMJIT_BUILD");
     clang_args.push_back("--std=c++14");
+    // optimize the generated IR: the eval function is called for every pair of particles in the
+    // MC loop. Users may override this with a later -O argument.
+    clang_args.push_back("-O3");
+    // the code executes on the same machine it is compiled on, so generate code for the host CPU
+    // (e.g. AVX2 and FMA instructions) and allow contraction of multiply-adds into FMAs.
+    clang_args.push_back(getHostCPUArgument());
+    clang_args.push_back("-ffp-contract=fast");
     // prevent the driver from creating empty output files in /tmp
     clang_args.push_back("-S");
     clang_args.push_back("-emit-llvm");
@@ -182,26 +215,5 @@ std::unique_ptr<llvm::Module> ClangCompiler::compileCode(const std::string& code
         return nullptr;
         }
 
-    // TODO: Run optimization passes
-    // see the posts following this one:
-    // https://wiki.nervtech.org/doku.php?id=blog:2020:0410_dynamic_cpp_compilation
-
-    //     llvm::PassBuilder passBuilder;
-    //     llvm::LoopAnalysisManager loopAnalysisManager(codeGenOptions.DebugPassManager);
-    //     llvm::FunctionAnalysisManager functionAnalysisManager(codeGenOptions.DebugPassManager);
-    //     llvm::CGSCCAnalysisManager cGSCCAnalysisManager(codeGenOptions.DebugPassManager);
-    //     llvm::ModuleAnalysisManager moduleAnalysisManager(codeGenOptions.DebugPassManager);
-
-    //     passBuilder.registerModuleAnalyses(moduleAnalysisManager);
-    //     passBuilder.registerCGSCCAnalyses(cGSCCAnalysisManager);
-    //     passBuilder.registerFunctionAnalyses(functionAnalysisManager);
-    //     passBuilder.registerLoopAnalyses(loopAnalysisManager);
-    //     passBuilder.crossRegisterProxies(loopAnalysisManager, functionAnalysisManager,
-    //     cGSCCAnalysisManager, moduleAnalysisManager);
-
-    //     llvm::ModulePassManager modulePassManager =
-    //     passBuilder.buildPerModuleDefaultPipeline(llvm::PassBuilder::OptimizationLevel::O3);
-    //     modulePassManager.run(*module, moduleAnalysisManager);
-
     return module;
     }
@@ -1,7 +1,10 @@
 #include "EvalFactory.h"
 #include "ClangCompiler.h"
 
+#include <list>
+#include <map>
 #include <memory>
+#include <mutex>
 #include <sstream>
 #include <utility>
 
@@ -19,6 +22,103 @@
 
 #pragma GCC diagnostic pop
 
+namespace
+    {
+//! Maximum number of modules kept in object_code_cache
+/*! Scripts that format parameter values into the code generate a new source string for every
+    value. Bound the cache so that these do not grow the memory use without limit.
+*/
+const size_t object_code_cache_capacity = 64;
+
+//! Keys of object_code_cache, most recently used first
+std::list<std::string> object_code_cache_order;
+
+//! Object code of previously compiled modules, keyed by the source code and compiler arguments
+/*! Compiling the C++ code with clang dominates the construction time of EvalFactory. Each
+    EvalFactory links its own copy of the cached object code so that the global variables (i.e.
+    param_array) remain independent between instances built from the same code. Entries are
+    evicted in least recently used order once the cache holds object_code_cache_capacity modules.
+*/
+std::map<std::string,
+         std::pair<std::list<std::string>::iterator, std::unique_ptr<llvm::MemoryBuffer>>>
+    object_code_cache;
+
+//! Mutex protecting object_code_cache and object_code_cache_order
+std::mutex object_code_cache_mutex;
+
+//! Records the object code generated when the JIT compiles a module
+class ObjectCapture : public llvm::ObjectCache
+    {
+    public:
+    void notifyObjectCompiled(const llvm::Module* M, llvm::MemoryBufferRef Obj) override
+        {
+        m_object = llvm::MemoryBuffer::getMemBufferCopy(Obj.getBuffer(),
+                                                        Obj.getBufferIdentifier());
+        }
+
+    std::unique_ptr<llvm::MemoryBuffer> getObject(const llvm::Module* M) override
+        {
+        return nullptr;
+        }
+
+    //! Take ownership of the captured object code
+    std::unique_ptr<llvm::MemoryBuffer> takeObject()
+        {
+        return std::move(m_object);
+        }
+
+    private:
+    std::unique_ptr<llvm::MemoryBuffer> m_object;
+    };
+
+//! Get a copy of the cached object code for the given key, or nullptr when there is none
+std::unique_ptr<llvm::MemoryBuffer> getCachedObject(const std::string& key)
+    {
+    std::lock_guard<std::mutex> lock(object_code_cache_mutex);
+    auto it = object_code_cache.find(key);
+    if (it == object_code_cache.end())
+        return nullptr;
+
+    // mark as most recently used
+    object_code_cache_order.splice(object_code_cache_order.begin(),
+                                   object_code_cache_order,
+                                   it->second.first);
+
+    const auto& object = it->second.second;
+    return llvm::MemoryBuffer::getMemBufferCopy(object->getBuffer(),
+                                                object->getBufferIdentifier());
+    }
+
+//! Store object code in the cache
+void storeCachedObject(const std::string& key, std::unique_ptr<llvm::MemoryBuffer> object)
+    {
+    if (!object)
+        return;
+
+    std::lock_guard<std::mutex> lock(object_code_cache_mutex);
+    auto it = object_code_cache.find(key);
+    if (it != object_code_cache.end())
+        {
+        // another instance compiled the same code concurrently
+        object_code_cache_order.splice(object_code_cache_order.begin(),
+                                       object_code_cache_order,
+                                       it->second.first);
+        it->second.second = std::move(object);
+        return;
+        }
+
+    // evict the least recently used entries
+    while (object_code_cache.size() >= object_code_cache_capacity)
+        {
+        object_code_cache.erase(object_code_cache_order.back());
+        object_code_cache_order.pop_back();
+        }
+
+    object_code_cache_order.push_front(key);
+    object_code_cache[key] = std::make_pair(object_code_cache_order.begin(), std::move(object));
+    }
+    } // end anonymous namespace
+
 //! C'tor
 EvalFactory::EvalFactory(const std::string& cpp_code,
                          const std::vector<std::string>& compiler_args,
@@ -41,18 +141,20 @@ EvalFactory::EvalFactory(const std::string& cpp_code,
 
     llvm::LLVMContext Context;
 
-    // compile the module
-    auto module = clang_compiler->compileCode(cpp_code, compiler_args, Context, sstream);
-
-    if (!module)
+    // reuse the object code when the same code has already been compiled with the same arguments
+    std::string cache_key = cpp_code;
+    for (auto& arg : compiler_args)
         {
-        // if the module didn't load, report an error
-        m_error_msg = sstream.str();
-        return;
+        cache_key += '\0';
+        cache_key += arg;
         }
+    std::unique_ptr<llvm::MemoryBuffer> cached_object = getCachedObject(cache_key);
+    bool cache_hit = bool(cached_object);
 
-    // Build the JIT
-    m_jit = llvm::orc::KaleidoscopeJIT::Create();
+    // Build the JIT, capturing the object code on a cache miss
+    auto object_capture = new ObjectCapture();
+    m_object_cache = std::unique_ptr<llvm::ObjectCache>(object_capture);
+    m_jit = llvm::orc::KaleidoscopeJIT::Create(cache_hit ? nullptr : object_capture);
 
     if (!m_jit)
         {
@@ -60,11 +162,33 @@ EvalFactory::EvalFactory(const std::string& cpp_code,
         return;
         }
 
-    // Add the module.
-    if (auto E = m_jit->addModule(std::move(module)))
+    if (cache_hit)
         {
-        m_error_msg = "Could not add JIT module.";
-        return;
+        // Add the cached object code.
+        if (auto E = m_jit->addObjectFile(std::move(cached_object)))
+            {
+            m_error_msg = "Could not add cached JIT object code.";
+            return;
+            }
+        }
+    else
+        {
+        // compile the module
+        auto module = clang_compiler->compileCode(cpp_code, compiler_args, Context, sstream);
+
+        if (!module)
+            {
+            // if the module didn't load, report an error
+            m_error_msg = sstream.str();
+            return;
+            }
+
+        // Add the module.
+        if (auto E = m_jit->addModule(std::move(module)))
+            {
+            m_error_msg = "Could not add JIT module.";
+            return;
+            }
         }
 
     // Look up the eval function pointer.
@@ -115,4 +239,10 @@ EvalFactory::EvalFactory(const std::string& cpp_code,
     /// this cast is like this because 1) it works correctly like this and
     /// 2) trying to use static_cast or reinterpret_cast gives compilation errors
     m_eval = (EvalFnPtr)(long unsigned int)(eval->getAddress());
+
+    // the symbol lookups above compiled the module, save the object code for later use
+    if (!cache_hit)
+        {
+        storeCachedObject(cache_key, object_capture->takeObject());
+        }
     }
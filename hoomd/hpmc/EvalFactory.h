@@ -62,6 +62,7 @@ class EvalFactory
         }
 
     private:
+    std::unique_ptr<llvm::ObjectCache> m_object_cache; //!< Captures the compiled object code
     std::unique_ptr<llvm::orc::KaleidoscopeJIT> m_jit; //!< The persistent JIT engine
     EvalFnPtr m_eval;                                  //!< Function pointer to evaluator
     float** m_alpha;                                   // Pointer to alpha array
@@ -255,6 +255,9 @@ void export_IntegratorHPMC(py::module& m)
         .def_readonly("overlap_errors", &hpmc_counters_t::overlap_err_count)
         .def_property_readonly("translate", &hpmc_counters_t::getTranslateCounts)
         .def_property_readonly("rotate", &hpmc_counters_t::getRotateCounts);
+
+    py::class_<hpmc::PatchEnergy, std::shared_ptr<hpmc::PatchEnergy>>(m, "PatchEnergy")
+        .def(py::init<std::shared_ptr<SystemDefinition>>());
     }
 
     } // end namespace hpmc
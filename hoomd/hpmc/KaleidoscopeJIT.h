@@ -22,6 +22,7 @@
 
 #include "llvm/ADT/StringRef.h"
 #include "llvm/ExecutionEngine/JITSymbol.h"
+#include "llvm/ExecutionEngine/ObjectCache.h"
 #include "llvm/ExecutionEngine/Orc/CompileUtils.h"
 #include "llvm/ExecutionEngine/Orc/Core.h"
 #include "llvm/ExecutionEngine/Orc/ExecutionUtils.h"
@@ -57,7 +58,7 @@ class KaleidoscopeJIT
     JITDylib& mainJD;
     SectionMemoryManager* memory_manager = nullptr;
 
-    KaleidoscopeJIT(JITTargetMachineBuilder JTMB, DataLayout DL)
+    KaleidoscopeJIT(JITTargetMachineBuilder JTMB, DataLayout DL, ObjectCache* ObjCache = nullptr)
         : ObjectLayer(ES,
                       [&]()
                       {
@@ -68,7 +69,8 @@ class KaleidoscopeJIT
           CompileLayer(
               ES,
               ObjectLayer,
-              std::make_unique<ConcurrentIRCompiler>(ConcurrentIRCompiler(std::move(JTMB)))),
+              std::make_unique<ConcurrentIRCompiler>(
+                  ConcurrentIRCompiler(std::move(JTMB), ObjCache))),
           DL(std::move(DL)), Mangle(ES, this->DL), Ctx(std::make_unique<LLVMContext>()),
 #if defined LLVM_VERSION_MAJOR && LLVM_VERSION_MAJOR > 10
           mainJD(this->ES.createBareJITDylib("<main>"))
@@ -94,19 +96,21 @@ class KaleidoscopeJIT
         return DL;
         }
 
-    static std::unique_ptr<KaleidoscopeJIT> Create()
+    static std::unique_ptr<KaleidoscopeJIT> Create(ObjectCache* ObjCache = nullptr)
         {
         auto JTMB = JITTargetMachineBuilder::detectHost();
 
         if (!JTMB)
             return nullptr;
 
+        JTMB->setCodeGenOptLevel(CodeGenOpt::Aggressive);
+
         auto DL = JTMB->getDefaultDataLayoutForTarget();
 
         if (!DL)
             return nullptr;
 
-        return std::make_unique<KaleidoscopeJIT>(std::move(*JTMB), std::move(*DL));
+        return std::make_unique<KaleidoscopeJIT>(std::move(*JTMB), std::move(*DL), ObjCache);
         }
 
     Error addModule(std::unique_ptr<Module> M)
@@ -114,6 +118,12 @@ class KaleidoscopeJIT
         return CompileLayer.add(mainJD, ThreadSafeModule(std::move(M), Ctx));
         }
 
+    //! Add an already compiled object file, bypassing the IR compile layer
+    Error addObjectFile(std::unique_ptr<MemoryBuffer> Obj)
+        {
+        return ObjectLayer.add(mainJD, std::move(Obj));
+        }
+
     Expected<JITEvaluatedSymbol> findSymbol(std::string Name)
         {
         return ES.lookup({&mainJD}, Mangle(Name));
@@ -0,0 +1,139 @@
+// Copyright (c) 2009-2021 The Regents of the University of Michigan
+// This file is part of the HOOMD-blue project, released under the BSD 3-Clause License.
+
+#ifndef _PATCH_ENERGY_EXTERNAL_FN_H_
+#define _PATCH_ENERGY_EXTERNAL_FN_H_
+
+#include "hoomd/HOOMDMath.h"
+#include "hoomd/VectorMath.h"
+#include "hoomd/hpmc/IntegratorHPMC.h"
+#include "hoomd/managed_allocator.h"
+
+#include <cstdint>
+#include <vector>
+
+#include <pybind11/numpy.h>
+#include <pybind11/pybind11.h>
+
+//! Evaluate patch energies with a function compiled outside of HOOMD
+/*! PatchEnergyExternalFn calls an eval function that has been compiled by another tool (e.g. the
+    host C++ compiler) and loaded into the process. The caller passes the address of the function,
+    which must have the same signature as the eval function compiled by PatchEnergyJIT.
+
+    Optionally, the caller also passes the address of a `float *` variable in the loaded code. On
+    construction, PatchEnergyExternalFn points this variable at its own copy of the parameter
+    array.
+
+    The caller is responsible for keeping the loaded code in memory for the lifetime of this
+    object.
+*/
+class PYBIND11_EXPORT PatchEnergyExternalFn : public hpmc::PatchEnergy
+    {
+    public:
+    //! function pointer signature
+    typedef float (*EvalFnPtr)(const vec3<float>& r_ij,
+                               unsigned int type_i,
+                               const quat<float>& q_i,
+                               float d_i,
+                               float charge_i,
+                               unsigned int type_j,
+                               const quat<float>& q_j,
+                               float d_j,
+                               float charge_j);
+
+    //! Constructor
+    /*! \param sysdef System definition
+        \param eval Address of the eval function
+        \param r_cut Center to center distance beyond which the patch energy is 0
+        \param param_array Values for the parameter array
+        \param param_array_ptr Address of the `float *` variable that the eval function reads the
+               parameter array from (0 when there is none)
+    */
+    PatchEnergyExternalFn(std::shared_ptr<SystemDefinition> sysdef,
+                          uintptr_t eval,
+                          Scalar r_cut,
+                          pybind11::array_t<float> param_array,
+                          uintptr_t param_array_ptr)
+        : PatchEnergy(sysdef), m_eval(reinterpret_cast<EvalFnPtr>(eval)), m_r_cut(r_cut),
+          m_param_array(param_array.data(), param_array.data() + param_array.size())
+        {
+        if (!m_eval)
+            {
+            throw std::runtime_error("PatchEnergyExternalFn: invalid eval function address.");
+            }
+
+        if (param_array_ptr)
+            {
+            *reinterpret_cast<float**>(param_array_ptr) = m_param_array.data();
+            }
+        }
+
+    //! Get the maximum r_ij radius beyond which energies are always 0
+    virtual Scalar getRCut()
+        {
+        return m_r_cut;
+        }
+
+    //! Set the maximum r_ij radius beyond which energies are always 0
+    void setRCut(Scalar r_cut)
+        {
+        m_r_cut = r_cut;
+        }
+
+    //! evaluate the energy of the patch interaction
+    /*! \param r_ij Vector pointing from particle i to j
+        \param type_i Integer type index of particle i
+        \param d_i Diameter of particle i
+        \param charge_i Charge of particle i
+        \param q_i Orientation quaternion of particle i
+        \param type_j Integer type index of particle j
+        \param q_j Orientation quaternion of particle j
+        \param d_j Diameter of particle j
+        \param charge_j Charge of particle j
+        \returns Energy of the patch interaction.
+    */
+    virtual float energy(const vec3<float>& r_ij,
+                         unsigned int type_i,
+                         const quat<float>& q_i,
+                         float d_i,
+                         float charge_i,
+                         unsigned int type_j,
+                         const quat<float>& q_j,
+                         float d_j,
+                         float charge_j)
+        {
+        return m_eval(r_ij, type_i, q_i, d_i, charge_i, type_j, q_j, d_j, charge_j);
+        }
+
+    static pybind11::object getParamArray(pybind11::object self)
+        {
+        auto self_cpp = self.cast<PatchEnergyExternalFn*>();
+        return pybind11::array(self_cpp->m_param_array.size(),
+                               self_cpp->m_param_array.data(),
+                               self);
+        }
+
+    protected:
+    EvalFnPtr m_eval; //!< Pointer to the evaluator function
+    Scalar m_r_cut;   //!< Cutoff radius
+    std::vector<float, managed_allocator<float>>
+        m_param_array; //!< Array containing adjustable parameters
+    };
+
+//! Exports the PatchEnergyExternalFn class to python
+inline void export_PatchEnergyExternalFn(pybind11::module& m)
+    {
+    pybind11::class_<PatchEnergyExternalFn,
+                     hpmc::PatchEnergy,
+                     std::shared_ptr<PatchEnergyExternalFn>>(m, "PatchEnergyExternalFn")
+        .def(pybind11::init<std::shared_ptr<SystemDefinition>,
+                            uintptr_t,
+                            Scalar,
+                            pybind11::array_t<float>,
+                            uintptr_t>())
+        .def_property("r_cut", &PatchEnergyExternalFn::getRCut, &PatchEnergyExternalFn::setRCut)
+        .def("energy", &PatchEnergyExternalFn::energy)
+        .def_property_readonly("param_array", &PatchEnergyExternalFn::getParamArray);
+    }
+
+#endif // _PATCH_ENERGY_EXTERNAL_FN_H_
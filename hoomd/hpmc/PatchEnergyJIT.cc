@@ -40,14 +40,31 @@ PatchEnergyJIT::PatchEnergyJIT(std::shared_ptr<SystemDefinition> sysdef,
         throw std::runtime_error(s.str());
         }
 
-    factory->setAlphaArray(&m_param_array.front());
+    factory->setAlphaArray(m_param_array.data());
     m_factory = std::shared_ptr<EvalFactory>(factory);
     }
 
+/*! \param cpu_code C++ code to compile.
+    \param compiler_args Additional arguments to pass to the compiler.
+    \param is_union Set to true when the code is for a union patch energy.
+
+    Compile the code and discard the result. EvalFactory caches the object code, so constructing a
+    patch energy with the same code later skips the compilation. Errors are reported when the patch
+    energy is constructed.
+*/
+void compileCPUCode(const std::string& cpu_code,
+                    const std::vector<std::string>& compiler_args,
+                    bool is_union)
+    {
+    EvalFactory factory(cpu_code, compiler_args, is_union);
+    }
+
 void export_PatchEnergyJIT(pybind11::module& m)
     {
-    pybind11::class_<hpmc::PatchEnergy, std::shared_ptr<hpmc::PatchEnergy>>(m, "PatchEnergy")
-        .def(pybind11::init<std::shared_ptr<SystemDefinition>>());
+    m.def("compile_cpu_code",
+          &compileCPUCode,
+          pybind11::call_guard<pybind11::gil_scoped_release>());
+
     pybind11::class_<PatchEnergyJIT, hpmc::PatchEnergy, std::shared_ptr<PatchEnergyJIT>>(
         m,
         "PatchEnergyJIT")
@@ -55,6 +55,12 @@ float PatchEnergyJITUnion::compute_leaf_leaf_energy(vec3<float> dr,
     float energy = 0.0;
     vec3<float> r_ab = rotate(conj(quat<float>(orientation_b)), vec3<float>(dr));
 
+    // orientation of a in the body frame of b, the same for all particles in the leaf
+    const quat<float> q_ab = conj(quat<float>(orientation_b)) * quat<float>(orientation_a);
+
+    // the compiler cannot hoist the member load past the calls to the JIT function
+    const Scalar r_cut_sq = m_r_cut_constituent * m_r_cut_constituent;
+
     // loop through leaf particles of cur_node_a
     unsigned int na = m_tree[type_a].getNumParticles(cur_node_a);
     unsigned int nb = m_tree[type_b].getNumParticles(cur_node_b);
@@ -64,11 +70,8 @@ float PatchEnergyJITUnion::compute_leaf_leaf_energy(vec3<float> dr,
         unsigned int ileaf = m_tree[type_a].getParticleByNode(cur_node_a, i);
 
         unsigned int type_i = m_type[type_a][ileaf];
-        quat<float> orientation_i = conj(quat<float>(orientation_b)) * quat<float>(orientation_a)
-                                    * m_orientation[type_a][ileaf];
-        vec3<float> pos_i(rotate(conj(quat<float>(orientation_b)) * quat<float>(orientation_a),
-                                 m_position[type_a][ileaf])
-                          - r_ab);
+        quat<float> orientation_i = q_ab * m_orientation[type_a][ileaf];
+        vec3<float> pos_i(rotate(q_ab, m_position[type_a][ileaf]) - r_ab);
 
         // loop through leaf particles of cur_node_b
         for (unsigned int j = 0; j < nb; j++)
@@ -80,7 +83,7 @@ float PatchEnergyJITUnion::compute_leaf_leaf_energy(vec3<float> dr,
             vec3<float> r_ij = m_position[type_b][jleaf] - pos_i;
 
             float rsq = dot(r_ij, r_ij);
-            if (rsq <= m_r_cut_constituent * m_r_cut_constituent)
+            if (rsq <= r_cut_sq)
                 {
                 // evaluate energy via JIT function
                 energy += m_eval_constituent(r_ij,
@@ -30,7 +30,7 @@ class PatchEnergyJITUnion : public PatchEnergyJIT
                          r_cut_isotropic,
                          param_array_isotropic,
                          true),
-          m_r_cut_constituent(r_cut_constituent),
+          m_leaf_capacity(4), m_r_cut_constituent(r_cut_constituent),
           m_param_array_constituent(param_array_constituent.data(),
                                     param_array_constituent.data() + param_array_constituent.size(),
                                     managed_allocator<float>(m_exec_conf->isCUDAEnabled()))
@@ -50,7 +50,7 @@ class PatchEnergyJITUnion : public PatchEnergyJIT
             throw std::runtime_error(s.str());
             }
 
-        factory_constituent->setAlphaUnionArray(&m_param_array_constituent.front());
+        factory_constituent->setAlphaUnionArray(m_param_array_constituent.data());
         m_factory_constituent = std::shared_ptr<EvalFactory>(factory_constituent);
 
         unsigned int ntypes = m_sysdef->getParticleData()->getNTypes();
@@ -213,8 +213,15 @@ class PatchEnergyJITUnion : public PatchEnergyJIT
     virtual void setLeafCapacity(unsigned int leaf_capacity)
         {
         m_leaf_capacity = leaf_capacity;
-        // m_build_obb = true;
-        // buildOBBTree(); // TODO: loop over all types
+
+        // rebuild the trees of the types that have constituent particles
+        for (unsigned int type_id = 0; type_id < m_position.size(); type_id++)
+            {
+            if (m_position[type_id].size() > 0)
+                {
+                buildOBBTree(type_id);
+                }
+            }
         }
 
     //! Get OBB leaf_capacity
@@ -83,6 +83,8 @@ class PYBIND11_EXPORT PatchEnergyJITUnionGPU : public PatchEnergyJITUnion
         {
         PatchEnergyJITUnion::buildOBBTree(type_id);
         m_d_union_params[type_id].tree = m_tree[type_id];
+        // cudaMemadviseReadMostly
+        m_d_union_params[type_id].set_memory_hint();
         }
 
     //! Set per-type typeid of constituent particles
@@ -4,6 +4,7 @@
 // Include the defined classes that are to be exported to python
 #include "IntegratorHPMC.h"
 #include "IntegratorHPMCMono.h"
+#include "PatchEnergyExternalFn.h"
 
 #include "ComputeSDF.h"
 #include "ShapeConvexPolygon.h"
@@ -58,6 +59,7 @@ using namespace hpmc::detail;
 PYBIND11_MODULE(_hpmc, m)
     {
     export_IntegratorHPMC(m);
+    export_PatchEnergyExternalFn(m);
 
     export_UpdaterBoxMC(m);
     export_UpdaterQuickCompress(m);
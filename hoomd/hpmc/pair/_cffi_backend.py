@@ -0,0 +1,172 @@
+# Copyright (c) 2009-2021 The Regents of the University of Michigan
+# This file is part of the HOOMD-blue project, released under the BSD 3-Clause
+# License.
+
+"""Compile user provided C++ code with the host C++ compiler.
+
+`hoomd.hpmc.pair.user` uses this backend on the CPU when HOOMD is built without
+LLVM. It builds the wrapped patch energy function as a Python extension module
+with cffi and passes the address of the ``eval`` function to
+``PatchEnergyExternalFn``.
+"""
+
+import hashlib
+import importlib.util
+import os
+import pathlib
+import platform
+import shutil
+import sysconfig
+import tempfile
+
+import hoomd
+from hoomd import _compile
+
+# flags that generate code for the host CPU, by platform.machine()
+_host_cpu_args = {
+    'x86_64': ['-march=native'],
+    'AMD64': ['-march=native'],
+    'i686': ['-march=native'],
+    'ppc64': ['-mcpu=native'],
+    'ppc64le': ['-mcpu=native'],
+    'aarch64': ['-mcpu=native'],
+    'arm64': ['-mcpu=native'],
+}
+
+# Hide the symbols of each module so that references to eval and param_array
+# bind within the module even when another copy is loaded with RTLD_GLOBAL.
+# Python marks the module init function visible.
+_extra_compile_args = [
+    '-std=c++14', '-O3', '-ffp-contract=fast', '-fvisibility=hidden',
+    '-DHOOMD_LLVMJIT_BUILD'
+] + _host_cpu_args.get(platform.machine(), [])
+
+# /proc/cpuinfo fields that identify the CPU model and its instruction sets
+_cpuinfo_keys = {
+    'model name', 'flags', 'cpu', 'Features', 'CPU implementer', 'CPU part'
+}
+
+_cdef = """
+    uintptr_t _hoomd_eval_address(void);
+    uintptr_t _hoomd_param_array_address(void);
+"""
+
+_exports = """
+#include <stdint.h>
+
+extern "C" uintptr_t _hoomd_eval_address()
+    {
+    return reinterpret_cast<uintptr_t>(&eval);
+    }
+
+extern "C" uintptr_t _hoomd_param_array_address()
+    {
+    return reinterpret_cast<uintptr_t>(&param_array);
+    }
+"""
+
+
+def _get_host_cpu():
+    """Identify the host CPU that the compiled modules target.
+
+    Modules built for one CPU may use instructions that other CPUs sharing the
+    same cache directory do not support.
+    """
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            fields = []
+            for line in cpuinfo:
+                # stop at the end of the first processor
+                if not line.strip():
+                    break
+                key, _, value = line.partition(':')
+                if key.strip() in _cpuinfo_keys:
+                    fields.append(value.strip())
+        if fields:
+            return '\0'.join(fields)
+    except OSError:
+        pass
+
+    return platform.machine() + '\0' + platform.processor()
+
+
+def _get_cache_dir():
+    """Get the directory that stores the compiled extension modules."""
+    cache_home = os.environ.get('XDG_CACHE_HOME',
+                                pathlib.Path.home() / '.cache')
+    return pathlib.Path(cache_home) / 'hoomd' / 'cffi'
+
+
+class CffiPatchEnergy:
+    """Patch energy function compiled with the host C++ compiler.
+
+    Compiled modules are cached on disk by the hash of their source code, the
+    HOOMD version, the compiler, the host CPU, and the Python ABI, so the
+    compiler only runs the first time a given function is used on a given
+    machine.
+
+    Each instance loads a private copy of the module. The ``param_array``
+    global in the C++ code is therefore independent between instances.
+
+    Args:
+        cpu_code (str): C++ code wrapped by
+            `CPPPotentialBase._wrap_cpu_code`.
+    """
+
+    def __init__(self, cpu_code):
+        try:
+            import cffi
+        except ImportError:
+            raise RuntimeError('hoomd.hpmc.pair.user requires cffi when HOOMD '
+                               'is built without LLVM.')
+
+        source = cpu_code + _exports
+        include_dirs = [str(_compile._get_hoomd_include_path())]
+        ext_suffix = sysconfig.get_config_var('EXT_SUFFIX')
+
+        # the module depends on the HOOMD headers, the compiler, the host CPU
+        # (-march=native), and the Python ABI in addition to the source
+        key = [
+            source, hoomd.version.version, hoomd.version.git_sha1,
+            os.environ.get('CXX',
+                           sysconfig.get_config_var('CXX') or ''),
+            _get_host_cpu(), ext_suffix
+        ] + include_dirs + _extra_compile_args
+        digest = hashlib.sha1('\0'.join(key).encode())
+        module_name = '_hoomd_patch_' + digest.hexdigest()
+
+        cache_dir = _get_cache_dir()
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        library = cache_dir / (module_name + ext_suffix)
+
+        # build on the same file system as the cache so os.replace works
+        with tempfile.TemporaryDirectory(dir=cache_dir) as tmpdir:
+            if not library.exists():
+                ffi = cffi.FFI()
+                ffi.cdef(_cdef)
+                ffi.set_source(module_name,
+                               source,
+                               source_extension='.cpp',
+                               include_dirs=include_dirs,
+                               extra_compile_args=_extra_compile_args)
+                built = pathlib.Path(ffi.compile(tmpdir=tmpdir))
+                # rename atomically so that concurrent processes never load a
+                # partially written file
+                os.replace(built, library)
+
+            private_copy = pathlib.Path(tmpdir) / ('private_' + library.name)
+            shutil.copyfile(library, private_copy)
+            spec = importlib.util.spec_from_file_location(
+                module_name, private_copy)
+            self._module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self._module)
+
+    @property
+    def eval_address(self):
+        """int: Address of the ``eval`` function."""
+        return self._module.lib._hoomd_eval_address()
+
+    @property
+    def param_array_address(self):
+        """int: Address of the ``param_array`` pointer."""
+        return self._module.lib._hoomd_param_array_address()
@@ -4,9 +4,12 @@
 
 """User-defined pair potentials for HPMC simulations."""
 
+import concurrent.futures
+
 import hoomd
 from hoomd import _compile
 from hoomd.hpmc import integrate
+from hoomd.hpmc import _hpmc
 if hoomd.version.llvm_enabled:
     from hoomd.hpmc import _jit
 from hoomd.operation import _HOOMDBaseObject
@@ -16,6 +19,63 @@ from hoomd.data.typeconverter import NDArrayValidator
 from hoomd.logging import log
 import numpy as np
 
+# Compiles the CPU code in the background while the user sets up the simulation
+_compile_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+
+# Wrappers that turn the user provided code into the eval function, with the
+# qualifier for the global parameter array pointers on each target. The
+# param_array (singlet class) or param_array_isotropic and
+# param_array_constituent (union class) pointers are allocated by the library.
+_wrappers = {
+    'cpu':
+        dict(qualifier='',
+             template="""
+#include <stdio.h>
+#include "hoomd/HOOMDMath.h"
+#include "hoomd/VectorMath.h"
+
+{param_arrays}
+
+extern "C"
+{{
+float eval(const vec3<float>& r_ij,
+           unsigned int type_i,
+           const quat<float>& q_i,
+           float d_i,
+           float charge_i,
+           unsigned int type_j,
+           const quat<float>& q_j,
+           float d_j,
+           float charge_j)
+    {{
+{code}
+    }}
+}}
+"""),
+    'gpu':
+        dict(qualifier='__device__ ',
+             template="""
+#include "hoomd/HOOMDMath.h"
+#include "hoomd/VectorMath.h"
+#include "hoomd/hpmc/IntegratorHPMCMonoGPUJIT.inc"
+
+{param_arrays}
+
+__device__ inline float eval(const vec3<float>& r_ij,
+                             unsigned int type_i,
+                             const quat<float>& q_i,
+                             float d_i,
+                             float charge_i,
+                             unsigned int type_j,
+                             const quat<float>& q_j,
+                             float d_j,
+                             float charge_j)
+    {{
+{code}
+    }}
+"""),
+}
+
 
 class CPPPotentialBase(_HOOMDBaseObject):
     """Base class for interaction between pairs of particles given in C++.
@@ -75,6 +135,15 @@ class CPPPotentialBase(_HOOMDBaseObject):
 
     """
 
+    _reserved_default_attrs = {
+        **_HOOMDBaseObject._reserved_default_attrs, '_compile_futures': dict
+    }
+    _skip_for_equality = _HOOMDBaseObject._skip_for_equality | {
+        '_compile_futures', '_cffi_patch'
+    }
+    _remove_for_pickling = _HOOMDBaseObject._remove_for_pickling + (
+        '_compile_futures', '_cffi_patch')
+
     @log(requires_run=True)
     def energy(self):
         """float: Total interaction energy of the system in the current state.
@@ -86,47 +155,68 @@ class CPPPotentialBase(_HOOMDBaseObject):
         timestep = self._simulation.timestep
         return integrator._cpp_obj.computePatchEnergy(timestep)
 
+    def _precompile(self, *codes):
+        """Start compiling the CPU code in the background.
+
+        The C++ layer caches the compiled object code, so `_attach` only needs
+        to link it when the code is unchanged.
+
+        Args:
+            codes (`str`): Bodies of the C++ functions
+        """
+        if not hoomd.version.llvm_enabled:
+            return
+
+        cpu_include_options = _compile.get_cpu_include_options()
+        self._compile_futures = {}
+        for code in codes:
+            cpu_code = self._wrap_cpu_code(code)
+            self._compile_futures[cpu_code] = _compile_pool.submit(
+                _jit.compile_cpu_code, cpu_code, cpu_include_options,
+                self._is_union)
+
+    def _wait_for_precompile(self, *cpu_codes):
+        """Wait for the background compilation of the given code to complete.
+
+        Compilations of code that has changed since `_precompile` are
+        cancelled when they have not started, and are not waited for.
+        Compilation errors are reported when the C++ object is constructed.
+
+        Args:
+            cpu_codes (`str`): Wrapped CPU code that `_attach` compiles
+        """
+        futures = []
+        for cpu_code, future in self._compile_futures.items():
+            if cpu_code in cpu_codes:
+                futures.append(future)
+            else:
+                future.cancel()
+        concurrent.futures.wait(futures)
+        self._compile_futures = {}
+
+    def _wrap_code(self, code, target):
+        """Wrap the provided code into a function with the expected signature.
+
+        Args:
+            code (`str`): Body of the C++ function
+            target (`str`): ``'cpu'`` or ``'gpu'``
+        """
+        qualifier = _wrappers[target]['qualifier']
+        if self._is_union:
+            param_arrays = (f'{qualifier}float *param_array_isotropic;\n'
+                            f'{qualifier}float *param_array_constituent;')
+        else:
+            param_arrays = f'{qualifier}float *param_array;'
+        return _wrappers[target]['template'].format(param_arrays=param_arrays,
+                                                    code=code)
+
     def _wrap_cpu_code(self, code):
-        r"""Wrap the provided code into a function with the expected signature.
+        """Wrap the provided code into a function with the expected signature.
 
         Args:
             code (`str`): Body of the C++ function
         """
-        param_array_suffix = {True: '_isotropic', False: ''}[self._is_union]
-        constituent_param_array = {
-            True: 'float *param_array_constituent;',
-            False: ''
-        }[self._is_union]
-        cpp_function = f"""
-                        #include <stdio.h>
-                        #include "hoomd/HOOMDMath.h"
-                        #include "hoomd/VectorMath.h"
-
-                        // param_array (singlet class) or param_array_isotropic
-                        // and param_array_constituent (union class) are
-                        // allocated by the library
-                        float *param_array{param_array_suffix};
-                        {constituent_param_array}
-
-                        extern "C"
-                        {{
-                        float eval(const vec3<float>& r_ij,
-                            unsigned int type_i,
-                            const quat<float>& q_i,
-                            float d_i,
-                            float charge_i,
-                            unsigned int type_j,
-                            const quat<float>& q_j,
-                            float d_j,
-                            float charge_j)
-                            {{
-                        """
-        cpp_function += code
-        cpp_function += """
-                            }
-                        }
-                        """
-        return cpp_function
+        return self._wrap_code(code, 'cpu')
 
     def _wrap_gpu_code(self, code):
         """Convert the provided code into a device function with the expected \
@@ -135,39 +225,7 @@ class CPPPotentialBase(_HOOMDBaseObject):
         Args:
             code (`str`): Body of the C++ function
         """
-        param_array_suffix = {True: '_isotropic', False: ''}[self._is_union]
-        constituent_str = '__device__ float *param_array_constituent;'
-        constituent_param_array = {
-            True: constituent_str,
-            False: ''
-        }[self._is_union]
-        cpp_function = f"""
-                        #include "hoomd/HOOMDMath.h"
-                        #include "hoomd/VectorMath.h"
-                        #include "hoomd/hpmc/IntegratorHPMCMonoGPUJIT.inc"
-
-                        // param_array (singlet class) or param_array_isotropic
-                        // and param_array_constituent (union class) are
-                        // allocated by the library
-                        __device__ float *param_array{param_array_suffix};
-                        {constituent_param_array}
-
-                        __device__ inline float eval(const vec3<float>& r_ij,
-                            unsigned int type_i,
-                            const quat<float>& q_i,
-                            float d_i,
-                            float charge_i,
-                            unsigned int type_j,
-                            const quat<float>& q_j,
-                            float d_j,
-                            float charge_j)
-                            {{
-                        """
-        cpp_function += code
-        cpp_function += """
-                            }
-                        """
-        return cpp_function
+        return self._wrap_code(code, 'gpu')
 
 
 class CPPPotential(CPPPotentialBase):
@@ -186,6 +244,12 @@ class CPPPotential(CPPPotentialBase):
             ``float *param_array`` in the compiled code. If no adjustable
             parameters are needed in the C++ code, pass an empty array.
 
+    Note:
+        When HOOMD is built without LLVM, `CPPPotential` compiles the code with
+        the host C++ compiler through `cffi <https://cffi.readthedocs.io/>`_
+        and caches the result in ``$XDG_CACHE_HOME/hoomd/cffi``. This backend
+        only supports execution on the CPU.
+
     See Also:
         `CPPPotentialBase` for the documentation of the parent class.
 
@@ -230,6 +294,7 @@ class CPPPotential(CPPPotentialBase):
         param_dict['param_array'] = param_array
         self._param_dict.update(param_dict)
         self.code = code
+        self._precompile(code)
 
     def _getattr_param(self, attr):
         if attr == 'code':
@@ -248,9 +313,13 @@ class CPPPotential(CPPPotentialBase):
         cpp_sys_def = self._simulation.state._cpp_sys_def
 
         cpu_code = self._wrap_cpu_code(self.code)
+        self._wait_for_precompile(cpu_code)
         cpu_include_options = _compile.get_cpu_include_options()
 
         if isinstance(device, hoomd.device.GPU):
+            if not hoomd.version.llvm_enabled:
+                raise RuntimeError("CPPPotential requires LLVM on the GPU.")
+
             gpu_settings = _compile.get_gpu_compilation_settings(device)
             gpu_code = self._wrap_gpu_code(self.code)
 
@@ -267,6 +336,16 @@ class CPPPotential(CPPPotentialBase):
                 gpu_settings["cuda_devrt_lib_path"],
                 gpu_settings["max_arch"],
             )
+        elif not hoomd.version.llvm_enabled:
+            from hoomd.hpmc.pair import _cffi_backend
+            self._cffi_patch = _cffi_backend.CffiPatchEnergy(cpu_code)
+            self._cpp_obj = _hpmc.PatchEnergyExternalFn(
+                cpp_sys_def,
+                self._cffi_patch.eval_address,
+                self.r_cut,
+                self.param_array,
+                self._cffi_patch.param_array_address,
+            )
         else:  # running on cpu
             self._cpp_obj = _jit.PatchEnergyJIT(
                 cpp_sys_def,
@@ -280,6 +359,113 @@ class CPPPotential(CPPPotentialBase):
         super()._attach()
 
 
+class CPPPotentialPy(CPPPotentialBase):
+    r"""Define an energetic interaction between pairs of particles in Python.
+
+    Args:
+        r_cut (float): Particle center to center distance cutoff beyond which
+            all pair interactions are assumed 0.
+        eval_fn (callable): Python function that computes the pair energy.
+
+    `CPPPotentialPy` compiles ``eval_fn`` to native code with `numba
+    <https://numba.pydata.org/>`_ and calls it in the MC loop in the same way
+    as the C++ code given to `CPPPotential`. ``eval_fn`` takes the same
+    arguments as the C++ ``eval`` function documented in `CPPPotentialBase`,
+    in the same order:
+
+    * ``r_ij``, ``q_i``, and ``q_j`` are pointers to ``float32`` values. Index
+      ``r_ij[0]``, ``r_ij[1]``, and ``r_ij[2]`` to access the vector
+      components. Quaternions are stored as ``(s, x, y, z)``.
+    * ``type_i`` and ``type_j`` are ``uint32`` values.
+    * ``d_i``, ``charge_i``, ``d_j``, and ``charge_j`` are ``float32`` values.
+
+    ``eval_fn`` must return the energy as a float. It must be written in the
+    subset of Python that numba compiles in ``nopython`` mode.
+
+    Note:
+        `CPPPotentialPy` requires numba and only supports execution on the CPU.
+
+    See Also:
+        `CPPPotentialBase` for the documentation of the parent class.
+
+    Warning:
+        `CPPPotentialPy` is **experimental** and subject to change in future
+        minor releases.
+
+    Attributes:
+        r_cut (float): Particle center to center distance cutoff beyond which
+            all pair interactions are assumed 0.
+        energy (float): The potential energy resulting from the interactions
+            defined in ``eval_fn`` at the current timestep.
+
+    Examples:
+        .. code-block:: python
+
+            def sq_well(r_ij, type_i, q_i, d_i, charge_i, type_j, q_j, d_j,
+                        charge_j):
+                rsq = r_ij[0]**2 + r_ij[1]**2 + r_ij[2]**2
+                return -1.0 if rsq < 1.21 else 0.0
+
+            patch = hoomd.hpmc.pair.user.CPPPotentialPy(r_cut=1.1,
+                                                        eval_fn=sq_well)
+            mc.pair_potential = patch
+            sim.run(1000)
+    """
+
+    _is_union = False
+
+    _skip_for_equality = CPPPotentialBase._skip_for_equality | {'_cfunc'}
+    _remove_for_pickling = CPPPotentialBase._remove_for_pickling + ('_cfunc',)
+
+    def __init__(self, r_cut, eval_fn):
+        param_dict = ParameterDict(r_cut=float)
+        param_dict['r_cut'] = r_cut
+        self._param_dict.update(param_dict)
+        self._eval_fn = eval_fn
+
+    @property
+    def eval_fn(self):
+        """callable: Python function that computes the pair energy."""
+        return self._eval_fn
+
+    def _compile_eval_fn(self):
+        """Compile ``eval_fn`` to a C callback with the ``eval`` signature."""
+        try:
+            import numba
+        except ImportError:
+            raise RuntimeError('CPPPotentialPy requires numba.')
+
+        types = numba.types
+        vector = types.CPointer(types.float32)
+        signature = types.float32(vector, types.uint32, vector, types.float32,
+                                  types.float32, types.uint32, vector,
+                                  types.float32, types.float32)
+        return numba.cfunc(signature)(self._eval_fn)
+
+    def _attach(self):
+        integrator = self._simulation.operations.integrator
+        if not isinstance(integrator, integrate.HPMCIntegrator):
+            raise RuntimeError("The integrator must be a HPMC integrator.")
+
+        if not integrator._attached:
+            raise RuntimeError("Integrator is not attached yet.")
+
+        if isinstance(self._simulation.device, hoomd.device.GPU):
+            raise RuntimeError("CPPPotentialPy only supports the CPU.")
+
+        # keep a reference to the compiled function for as long as the C++
+        # object calls it
+        self._cfunc = self._compile_eval_fn()
+        self._cpp_obj = _hpmc.PatchEnergyExternalFn(
+            self._simulation.state._cpp_sys_def,
+            self._cfunc.address,
+            self.r_cut,
+            np.zeros(0, dtype=np.float32),
+            0,
+        )
+        super()._attach()
+
+
 class CPPPotentialUnion(CPPPotentialBase):
     r"""Define an arbitrary energetic interaction between unions of particles.
 
@@ -498,6 +684,16 @@ class CPPPotentialUnion(CPPPotentialBase):
 
         self.code_constituent = code_constituent
         self.code_isotropic = code_isotropic
+        self._precompile(code_constituent, self._get_isotropic_code())
+
+    def _get_isotropic_code(self):
+        """Get the body of the isotropic function to compile.
+
+        An empty ``code_isotropic`` compiles to a function that returns 0.
+        """
+        if self.code_isotropic == '':
+            return 'return 0;'
+        return self.code_isotropic
 
     def _getattr_param(self, attr):
         code_attrs = {'code_isotropic', 'code_constituent'}
@@ -513,6 +709,9 @@ class CPPPotentialUnion(CPPPotentialBase):
         if not integrator._attached:
             raise RuntimeError("Integrator is not attached yet.")
 
+        if not hoomd.version.llvm_enabled:
+            raise RuntimeError("CPPPotentialUnion requires LLVM.")
+
         if isinstance(self._simulation.device, hoomd.device.GPU):
             if self.code_isotropic != '':
                 msg = 'Code passed into code_isotropic when excuting on the '
@@ -520,10 +719,8 @@ class CPPPotentialUnion(CPPPotentialBase):
                 raise RuntimeError(msg)
 
         cpu_code_constituent = self._wrap_cpu_code(self.code_constituent)
-        if self.code_isotropic != '':
-            cpu_code_isotropic = self._wrap_cpu_code(self.code_isotropic)
-        else:
-            cpu_code_isotropic = self._wrap_cpu_code('return 0;')
+        cpu_code_isotropic = self._wrap_cpu_code(self._get_isotropic_code())
+        self._wait_for_precompile(cpu_code_constituent, cpu_code_isotropic)
         cpu_include_options = _compile.get_cpu_include_options()
 
         device = self._simulation.device
@@ -426,6 +426,54 @@ def test_param_array_union_gpu(device, simulation_factory,
     assert (np.isclose(old_energy * scale_factor, patch.energy))
 
 
+@pytest.mark.skipif(llvm_disabled, reason='LLVM not enabled')
+def test_leaf_capacity_after_attach(device, simulation_factory,
+                                    two_particle_snapshot_factory):
+    """Test that rebuilding the constituent trees keeps the energy unchanged."""
+    square_well_constituent = """
+                   float rsq = dot(r_ij, r_ij);
+                   if (rsq < 1.21f)
+                       return -1.0f;
+                   else
+                       return 0.0f;
+                  """
+
+    sim = simulation_factory(two_particle_snapshot_factory(d=1, L=40))
+    patch = hoomd.hpmc.pair.user.CPPPotentialUnion(
+        code_isotropic='',
+        r_cut_isotropic=0,
+        code_constituent=square_well_constituent,
+        param_array_constituent=[],
+        r_cut_constituent=1.1,
+        param_array_isotropic=[],
+    )
+    # the two unions face each other along x, so only constituents at the
+    # same y interact
+    const_particle_pos = [(0.0, -1.5, 0), (0.0, -0.5, 0), (0.0, 0.5, 0),
+                          (0.0, 1.5, 0)]
+    patch.positions['A'] = const_particle_pos
+    patch.orientations['A'] = [(1, 0, 0, 0)] * 4
+    patch.diameters['A'] = [0] * 4
+    patch.typeids['A'] = [0] * 4
+    patch.charges['A'] = [0] * 4
+    mc = hoomd.hpmc.integrate.SphereUnion()
+    sphere = dict(diameter=0)
+    mc.shape["A"] = dict(shapes=[sphere] * 4,
+                         positions=const_particle_pos,
+                         orientations=[(1, 0, 0, 0)] * 4)
+    mc.pair_potential = patch
+    sim.operations.integrator = mc
+
+    sim.run(0)
+    energy = patch.energy
+    assert np.isclose(energy, -4.0)
+
+    for leaf_capacity in [1, 2, 4]:
+        patch.leaf_capacity = leaf_capacity
+        sim.run(0)
+        assert np.isclose(patch.energy, energy)
+
+
 @pytest.mark.validate
 @pytest.mark.skipif(llvm_disabled, reason='LLVM not enabled')
 def test_cpp_potential_union_sticky_spheres(device, simulation_factory,
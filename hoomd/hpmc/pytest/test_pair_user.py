@@ -4,6 +4,8 @@
 
 """Test hoomd.hpmc.pair.user.CPPPotential."""
 
+import concurrent.futures
+
 import hoomd
 import pytest
 import numpy as np
@@ -351,3 +353,200 @@ def test_cpp_potential_sticky_spheres(device, simulation_factory,
             dist = np.linalg.norm(snap.particles.position[0]
                                   - snap.particles.position[1])
             assert dist > max_r_interact
+
+
+@pytest.mark.skipif(llvm_disabled, reason='LLVM not enabled')
+@pytest.mark.parametrize("change_code", [False, True])
+def test_attach_after_precompile(device, simulation_factory,
+                                 two_particle_snapshot_factory, change_code):
+    """Test attaching potentials that compile their code in the background.
+
+    The constructor starts compiling the code. Attaching immediately must
+    wait for the compilation, and attaching after changing the code must
+    compile and evaluate the new code without waiting for the stale
+    compilation.
+    """
+    sim = simulation_factory(two_particle_snapshot_factory(d=2, L=100))
+    patch = hoomd.hpmc.pair.user.CPPPotential(r_cut=3,
+                                              code="return -3.0f;",
+                                              param_array=[])
+    if change_code:
+        # stand in for a compilation of the old code that has not started
+        stale_code = patch._wrap_cpu_code("return -3.0f;")
+        stale_future = concurrent.futures.Future()
+        patch._compile_futures[stale_code] = stale_future
+        patch.code = "return -4.0f;"
+
+    mc = hoomd.hpmc.integrate.Sphere()
+    mc.shape['A'] = dict(diameter=1)
+    mc.pair_potential = patch
+    sim.operations.integrator = mc
+    sim.run(0)
+
+    expected = -4.0 if change_code else -3.0
+    assert np.isclose(patch.energy, expected)
+    if change_code:
+        assert stale_future.cancelled()
+
+
+@pytest.mark.validate
+@pytest.mark.skipif(llvm_disabled, reason='LLVM not enabled')
+def test_object_code_cache(device, simulation_factory,
+                           two_particle_snapshot_factory):
+    """Test that reusing compiled object code evaluates the right code.
+
+    The C++ layer caches the object code of each compiled module. Attaching
+    code that was compiled before must link the cached code for that source,
+    not for any other.
+    """
+    energies = []
+    for value in [-1.0, -2.0, -1.0, -2.0]:
+        sim = simulation_factory(two_particle_snapshot_factory(d=2, L=100))
+        patch = hoomd.hpmc.pair.user.CPPPotential(r_cut=3,
+                                                  code=f"return {value}f;",
+                                                  param_array=[])
+        mc = hoomd.hpmc.integrate.Sphere()
+        mc.shape['A'] = dict(diameter=1)
+        mc.pair_potential = patch
+        sim.operations.integrator = mc
+        sim.run(0)
+        energies.append(patch.energy)
+
+    np.testing.assert_allclose(energies, [-1.0, -2.0, -1.0, -2.0])
+
+
+@pytest.mark.validate
+@pytest.mark.skipif(llvm_disabled, reason='LLVM not enabled')
+def test_param_array_same_code(device, simulation_factory,
+                               two_particle_snapshot_factory):
+    """Test potentials that share code have independent parameter arrays.
+
+    The compiled code is reused between potentials with the same code, which
+    must not share the parameter array.
+    """
+    code = "return param_array[0];"
+    energies = []
+    for value in [-1.0, -2.0]:
+        sim = simulation_factory(two_particle_snapshot_factory(d=2, L=100))
+        patch = hoomd.hpmc.pair.user.CPPPotential(r_cut=3,
+                                                  code=code,
+                                                  param_array=[value])
+        mc = hoomd.hpmc.integrate.Sphere()
+        mc.shape['A'] = dict(diameter=1)
+        mc.pair_potential = patch
+        sim.operations.integrator = mc
+        sim.run(0)
+        energies.append(patch.energy)
+
+    assert np.isclose(energies[0], -1.0)
+    assert np.isclose(energies[1], -2.0)
+
+
+def _cffi_simulation(simulation_factory, two_particle_snapshot_factory, code,
+                     param_array):
+    """Make a simulation with a CPPPotential compiled by the cffi backend."""
+    sim = simulation_factory(two_particle_snapshot_factory(d=2, L=100))
+    patch = hoomd.hpmc.pair.user.CPPPotential(r_cut=3,
+                                              code=code,
+                                              param_array=param_array)
+    mc = hoomd.hpmc.integrate.Sphere()
+    mc.shape['A'] = dict(diameter=1)
+    mc.pair_potential = patch
+    sim.operations.integrator = mc
+    sim.run(0)
+    return sim, patch
+
+
+@pytest.mark.cpu
+@pytest.mark.skipif(not llvm_disabled, reason='cffi backend requires no LLVM')
+def test_cffi_energy(device, simulation_factory, two_particle_snapshot_factory):
+    """Test energies computed by the cffi backend."""
+    pytest.importorskip('cffi')
+
+    code = """float rsq = dot(r_ij, r_ij);
+              return rsq < 4.41f ? param_array[0] : 0.0f;
+           """
+    sim, patch = _cffi_simulation(simulation_factory,
+                                  two_particle_snapshot_factory, code, [-1.5])
+    assert np.isclose(patch.energy, -1.5)
+
+    # param_array may be modified after attaching
+    patch.param_array[0] = -2.5
+    assert np.isclose(patch.energy, -2.5)
+
+
+@pytest.mark.cpu
+@pytest.mark.skipif(not llvm_disabled, reason='cffi backend requires no LLVM')
+def test_cffi_param_array_same_code(device, simulation_factory,
+                                    two_particle_snapshot_factory):
+    """Test that attached potentials with the same code are independent."""
+    pytest.importorskip('cffi')
+
+    code = "return param_array[0];"
+    sim_a, patch_a = _cffi_simulation(simulation_factory,
+                                      two_particle_snapshot_factory, code,
+                                      [-1.0])
+    sim_b, patch_b = _cffi_simulation(simulation_factory,
+                                      two_particle_snapshot_factory, code,
+                                      [-2.0])
+    assert np.isclose(patch_a.energy, -1.0)
+    assert np.isclose(patch_b.energy, -2.0)
+
+    patch_a.param_array[0] = -3.0
+    assert np.isclose(patch_a.energy, -3.0)
+    assert np.isclose(patch_b.energy, -2.0)
+
+
+@pytest.mark.cpu
+def test_python_potential(device, simulation_factory,
+                          two_particle_snapshot_factory):
+    """Test that CPPPotentialPy evaluates the compiled Python function."""
+    pytest.importorskip('numba')
+
+    def eval_fn(r_ij, type_i, q_i, d_i, charge_i, type_j, q_j, d_j, charge_j):
+        rsq = r_ij[0]**2 + r_ij[1]**2 + r_ij[2]**2
+        return -1.0 if rsq < 2.25 else 0.0
+
+    energies = []
+    for d in [1, 2]:
+        sim = simulation_factory(two_particle_snapshot_factory(d=d, L=100))
+        patch = hoomd.hpmc.pair.user.CPPPotentialPy(r_cut=3, eval_fn=eval_fn)
+        mc = hoomd.hpmc.integrate.Sphere()
+        mc.shape['A'] = dict(diameter=0)
+        mc.pair_potential = patch
+        sim.operations.integrator = mc
+        sim.run(0)
+        energies.append(patch.energy)
+
+    assert np.isclose(energies[0], -1.0)
+    assert np.isclose(energies[1], 0.0)
+
+
+@pytest.mark.cpu
+def test_python_potential_arguments(device, simulation_factory,
+                                    two_particle_snapshot_factory):
+    """Test the type and quaternion arguments passed to the Python function.
+
+    Quaternions are passed as pointers to ``(s, x, y, z)``.
+    """
+    pytest.importorskip('numba')
+
+    def eval_fn(r_ij, type_i, q_i, d_i, charge_i, type_j, q_j, d_j, charge_j):
+        return q_i[0] + q_i[2] + q_j[0] + q_j[2] + 10 * (type_i + type_j)
+
+    snap = two_particle_snapshot_factory(particle_types=['A', 'B'], d=2, L=100)
+    if snap.communicator.rank == 0:
+        snap.particles.typeid[:] = [0, 1]
+        # rotation by pi about the y axis: s = 0, y = 1
+        snap.particles.orientation[:] = [(0, 0, 1, 0), (0, 0, 1, 0)]
+    sim = simulation_factory(snap)
+
+    patch = hoomd.hpmc.pair.user.CPPPotentialPy(r_cut=3, eval_fn=eval_fn)
+    mc = hoomd.hpmc.integrate.Sphere()
+    mc.shape['A'] = dict(diameter=0)
+    mc.shape['B'] = dict(diameter=0)
+    mc.pair_potential = patch
+    sim.operations.integrator = mc
+    sim.run(0)
+
+    assert np.isclose(patch.energy, 12.0)
@@ -47,7 +47,8 @@ template<class T> class managed_allocator
         else
 #endif
             {
-            int retval = posix_memalign(&result, 32, n * sizeof(T));
+            // align to the cache line size
+            int retval = posix_memalign(&result, 64, n * sizeof(T));
             if (retval != 0)
                 {
                 throw std::runtime_error("Error allocating aligned memory");
@@ -9,6 +9,11 @@
 #include <map>
 #include <sstream>
 #include <string.h>
+
+#ifdef ENABLE_TBB
+#include <tbb/blocked_range.h>
+#include <tbb/parallel_for.h>
+#endif
 namespace py = pybind11;
 
 /*! \file ForceComposite.cc
@@ -918,7 +923,23 @@ void ForceComposite::updateCompositeParticles(uint64_t timestep)
 
     // we need to update both local and ghost particles
     unsigned int n_particles_local = m_pdata->getN() + m_pdata->getNGhosts();
+
+    // each iteration only writes the constituent particle it updates and central particles are
+    // never written, so the particles can be updated in parallel. The grain size keeps small
+    // systems in a single task, where scheduling overhead would exceed the work.
+#ifdef ENABLE_TBB
+    m_exec_conf->getTaskArena()->execute(
+        [&]
+        {
+            tbb::parallel_for(
+                tbb::blocked_range<unsigned int>(0, n_particles_local, 256),
+                [&](const tbb::blocked_range<unsigned int>& r)
+                {
+                    for (unsigned int particle_index = r.begin(); particle_index != r.end();
+                         ++particle_index)
+#else
     for (unsigned int particle_index = 0; particle_index < n_particles_local; particle_index++)
+#endif
         {
         unsigned int central_tag = h_body.data[particle_index];
 
@@ -1015,6 +1036,10 @@ void ForceComposite::updateCompositeParticles(uint64_t timestep)
         h_orientation.data[particle_index] = quat_to_scalar4(updated_orientation);
         h_image.data[particle_index] = img + imgi;
         }
+#ifdef ENABLE_TBB
+                });
+        }); // end task arena execute()
+#endif
     }
 
 void export_ForceComposite(py::module& m)
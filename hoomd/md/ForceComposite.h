@@ -114,6 +114,11 @@ class PYBIND11_EXPORT ForceComposite : public MolecularForceCompute
         std::vector<Scalar> charge_vector;
         std::vector<Scalar> diameter_vector;
         std::vector<unsigned int> type_vector;
+        pos_vector.reserve(N);
+        orientation_vector.reserve(N);
+        charge_vector.reserve(N);
+        diameter_vector.reserve(N);
+        type_vector.reserve(N);
 
         for (size_t i(0); i < N; ++i)
             {
@@ -176,10 +176,14 @@ def test_create_bodies(simulation_factory, two_particle_snapshot_factory,
     sim.run(0)
 
 
+@pytest.mark.parametrize("convert", [list, np.array], ids=["list", "ndarray"])
 def test_attaching(simulation_factory, two_particle_snapshot_factory,
-                   valid_body_definition):
+                   valid_body_definition, convert):
     rigid = md.constrain.Rigid()
-    rigid.body["A"] = valid_body_definition
+    body_definition = {**valid_body_definition}
+    for key in ("positions", "orientations", "charges", "diameters"):
+        body_definition[key] = convert(valid_body_definition[key])
+    rigid.body["A"] = body_definition
     langevin = md.methods.Langevin(kT=2.0, filter=hoomd.filter.Rigid())
     integrator = md.Integrator(dt=0.005, methods=[langevin])
     integrator.rigid = rigid